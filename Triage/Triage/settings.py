@@ -96,9 +96,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so transactions that
+        # read before writing (select_for_update) wait for each other instead
+        # of failing with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# Append-only log of TriageRequest changes (see login/events.py)
+TRIAGE_EVENT_LOG_DIR = BASE_DIR / 'event_log'
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
@@ -0,0 +1,46 @@
+"""
+API-only settings for Triage workers.
+
+Serves the JSON routes under /api/ without the admin, messages,
+templates, CSRF and clickjacking layers the browser-facing site needs.
+Select it with:
+
+    DJANGO_SETTINGS_MODULE=Triage.settings_api gunicorn Triage.wsgi
+
+Authenticated session POSTs are still CSRF-checked by DRF's
+SessionAuthentication, so dropping CsrfViewMiddleware does not open
+those endpoints up.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'login',
+    'corsheaders',
+    'rest_framework',
+    'rest_framework.authtoken',
+]
+
+MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+]
+
+ROOT_URLCONF = 'Triage.urls_api'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    # The browsable API renderer pulls in templates and static files
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+    ],
+}
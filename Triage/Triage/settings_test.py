@@ -0,0 +1,15 @@
+"""
+Settings for running the test suite. ``python manage.py test`` picks this
+module by default; pass ``--settings`` to test against something else.
+
+Uses a file-backed test database so threaded tests get SQLite's normal
+busy-wait locking instead of the shared-cache table locks of the default
+in-memory test database.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+DATABASES['default']['TEST'] = {  # noqa: F405
+    'NAME': BASE_DIR / 'test_db.sqlite3',  # noqa: F405
+}
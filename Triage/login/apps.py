@@ -3,3 +3,16 @@ from django.apps import AppConfig
 
 class LoginConfig(AppConfig):
     name = 'login'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+
+        from . import events, sync
+        from .models import Patient, TriageRequest
+
+        post_init.connect(events.snapshot_tracked_fields, sender=TriageRequest)
+        post_save.connect(events.record_tracked_changes, sender=TriageRequest)
+
+        pre_delete.connect(sync.collect_deletion_audience, sender=Patient)
+        post_delete.connect(sync.record_deletion, sender=Patient)
+        post_delete.connect(sync.record_deletion, sender=TriageRequest)
@@ -0,0 +1,105 @@
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .events import record_change
+from .models import TriageRequest
+
+
+# Higher-risk cases are handed out first, oldest first within a risk level.
+RISK_PRIORITY = Case(
+    When(predicted_risk__iexact="high", then=Value(0)),
+    When(predicted_risk__iexact="medium", then=Value(1)),
+    When(predicted_risk__iexact="low", then=Value(2)),
+    default=Value(3),
+    output_field=IntegerField(),
+)
+
+
+def claim_request(request_id, doctor):
+    """
+    Atomically assign one triage request to ``doctor``.
+
+    The assignment is a single conditional UPDATE, so two doctors racing
+    for the same case can never both win. Returns True if this call
+    claimed the request.
+    """
+    updated = TriageRequest.objects.filter(
+        pk=request_id,
+        assigned_doctor__isnull=True,
+    ).update(
+        assigned_doctor=doctor,
+        assigned_at=timezone.now(),
+        version=F("version") + 1,
+    )
+    if updated:
+        record_change(request_id, {"assigned_doctor_id": doctor.pk})
+    return updated == 1
+
+
+def reassign_request(request_id, doctor, expected_version):
+    """
+    Move an already-assigned request to ``doctor``.
+
+    Succeeds only if nobody has changed the assignment since the caller
+    read ``expected_version``. Returns True on success.
+    """
+    updated = TriageRequest.objects.filter(
+        pk=request_id,
+        version=expected_version,
+    ).update(
+        assigned_doctor=doctor,
+        assigned_at=timezone.now() if doctor is not None else None,
+        version=F("version") + 1,
+    )
+    if updated:
+        record_change(request_id, {"assigned_doctor_id": doctor.pk if doctor is not None else None})
+    return updated == 1
+
+
+def release_request(request_id, doctor):
+    """Hand a request claimed by ``doctor`` back to the unassigned pool."""
+    updated = TriageRequest.objects.filter(
+        pk=request_id,
+        assigned_doctor=doctor,
+    ).update(
+        assigned_doctor=None,
+        assigned_at=None,
+        version=F("version") + 1,
+    )
+    if updated:
+        record_change(request_id, {"assigned_doctor_id": None})
+    return updated == 1
+
+
+def claim_next(doctor, limit=1):
+    """
+    Claim up to ``limit`` of the next unassigned requests for ``doctor``.
+
+    Candidates are read without locks and then claimed one by one with
+    ``claim_request``; rows lost to a concurrent claimer are skipped and
+    the next window is fetched until ``limit`` is reached or the queue is
+    empty. Returns the list of claimed request ids in priority order.
+    """
+    claimed = []
+    skipped = set()
+
+    while len(claimed) < limit:
+        candidates = list(
+            TriageRequest.objects.filter(assigned_doctor__isnull=True)
+            .exclude(pk__in=skipped)
+            .annotate(risk_priority=RISK_PRIORITY)
+            .order_by("risk_priority", "created_at", "pk")
+            .values_list("pk", flat=True)[: (limit - len(claimed)) * 2]
+        )
+        if not candidates:
+            break
+
+        for request_id in candidates:
+            if claim_request(request_id, doctor):
+                claimed.append(request_id)
+                if len(claimed) == limit:
+                    break
+            else:
+                skipped.add(request_id)
+
+    return claimed
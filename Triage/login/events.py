@@ -0,0 +1,376 @@
+import atexit
+import heapq
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+
+# Fields on TriageRequest whose changes are recorded in the event log
+TRACKED_FIELDS = (
+    "systolic_bp",
+    "heart_rate",
+    "temperature",
+    "oxygen",
+    "predicted_risk",
+    "assigned_doctor_id",
+)
+
+SEGMENT_SUFFIX = ".ndjson"
+INDEX_SUFFIX = ".idx"
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """
+    Append-only log of TriageRequest changes.
+
+    ``record`` only appends to an in-memory buffer; a background thread
+    writes the buffer in batches to NDJSON segment files, so the model
+    save path never waits on the log. Each event is one line:
+
+        {"s": seq, "t": unix_time, "r": request_id, "c": {field: value}}
+
+    Every process writes only to its own ``<directory>/<writer>/``
+    subdirectory (host and pid by default), so sequence numbers and file
+    offsets never race between workers; readers merge all writers. Each
+    segment is named after its first sequence number and has a sidecar
+    ``.idx`` file of ``[request_id, offset]`` lines, which lets ``history``
+    seek straight to one request's events.
+
+    Writers flush independently, so a feed position is a cursor per
+    writer (``{writer: last_seq}``) rather than a single number.
+    """
+
+    def __init__(self, directory, writer=None, flush_size=256, flush_interval=1.0,
+                 segment_max_bytes=8 * 1024 * 1024):
+        self.directory = str(directory)
+        self.writer = writer or f"{socket.gethostname()}-{os.getpid()}"
+        self.writer_directory = os.path.join(self.directory, self.writer)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        # request_id -> [(writer, segment_name, offset), ...], filled lazily
+        # from every writer's .idx files
+        self._index = {}
+        # (writer, segment_name) -> bytes of its .idx file already read
+        self._index_positions = {}
+        self._seq = 0
+        self._segment = None
+
+        self._load()
+
+        self._flusher = threading.Thread(target=self._run, daemon=True)
+        self._flusher.start()
+
+    # 🔹 Writing
+
+    def record(self, request_id, changes):
+        """Queue a change event for ``request_id`` and return its sequence number."""
+        with self._buffer_lock:
+            self._seq += 1
+            self._buffer.append({
+                "s": self._seq,
+                "t": round(time.time(), 3),
+                "r": request_id,
+                "c": changes,
+            })
+            seq = self._seq
+            full = len(self._buffer) >= self.flush_size
+
+        if full:
+            self._wakeup.set()
+        return seq
+
+    def flush(self):
+        """
+        Write all buffered events to disk. If the write fails the batch goes
+        back on the buffer, so it is retried by the next flush.
+        """
+        with self._write_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            try:
+                self._write(batch)
+            except OSError:
+                with self._buffer_lock:
+                    self._buffer[:0] = batch
+                raise
+
+    def _write(self, batch):
+        os.makedirs(self.writer_directory, exist_ok=True)
+        if self._segment is None or self._segment_size() >= self.segment_max_bytes:
+            self._segment = f"{batch[0]['s']:012d}"
+
+        segment_path = self._path(self.writer, self._segment, SEGMENT_SUFFIX)
+        index_path = self._path(self.writer, self._segment, INDEX_SUFFIX)
+        segment_size = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+        index_size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+
+        lines = []
+        index_lines = []
+        offset = segment_size
+        for event in batch:
+            line = (json.dumps(event, separators=(",", ":")) + "\n").encode()
+            lines.append(line)
+            index_lines.append(json.dumps([event["r"], offset]) + "\n")
+            offset += len(line)
+
+        try:
+            # Segment first, so an index entry never points past the data
+            with open(segment_path, "ab") as segment:
+                segment.write(b"".join(lines))
+            with open(index_path, "a") as index:
+                index.write("".join(index_lines))
+        except OSError:
+            # Drop any partial append so the retry doesn't duplicate events
+            for path, size in ((segment_path, segment_size), (index_path, index_size)):
+                try:
+                    if os.path.exists(path):
+                        os.truncate(path, size)
+                except OSError:
+                    pass
+            raise
+
+    def close(self):
+        """Stop the background flusher and write anything still buffered."""
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join()
+        self.flush()
+
+    # 🔹 Reading
+
+    def history(self, request_id):
+        """All events for one request from every writer, oldest first."""
+        self.flush()
+        self._refresh_index()
+
+        events = []
+        handles = {}
+        try:
+            for writer, segment_name, offset in list(self._index.get(request_id, [])):
+                key = (writer, segment_name)
+                if key not in handles:
+                    handles[key] = open(self._path(writer, segment_name, SEGMENT_SUFFIX), "rb")
+                segment = handles[key]
+                segment.seek(offset)
+                events.append({**json.loads(segment.readline()), "w": writer})
+        finally:
+            for segment in handles.values():
+                segment.close()
+        return sorted(events, key=lambda event: (event["t"], event["w"], event["s"]))
+
+    def rebuild(self, request_id):
+        """Latest value of every tracked field for ``request_id``, from the log alone."""
+        state = {}
+        for event in self.history(request_id):
+            state.update(event["c"])
+        return state
+
+    def replay(self, after=None):
+        """
+        Yield every event past the per-writer cursor ``after``, merged across
+        writers in time order. Each event carries its writer as ``"w"``.
+        """
+        self.flush()
+        after = after or {}
+
+        streams = [
+            self._replay_writer(writer, after.get(writer, 0))
+            for writer in self._writers()
+        ]
+        yield from heapq.merge(*streams, key=lambda event: (event["t"], event["w"], event["s"]))
+
+    # 🔹 Internals
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Event log flush failed; %d events kept for retry", len(self._buffer))
+
+    def _path(self, writer, segment_name, suffix):
+        return os.path.join(self.directory, writer, segment_name + suffix)
+
+    def _writers(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, name))
+        )
+
+    def _segment_names(self, writer):
+        writer_directory = os.path.join(self.directory, writer)
+        if not os.path.isdir(writer_directory):
+            return []
+        return sorted(
+            name[: -len(SEGMENT_SUFFIX)]
+            for name in os.listdir(writer_directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _segment_size(self):
+        path = self._path(self.writer, self._segment, SEGMENT_SUFFIX)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _replay_writer(self, writer, after):
+        segment_names = self._segment_names(writer)
+
+        for position, segment_name in enumerate(segment_names):
+            # Segment names are their first sequence number, so a segment
+            # whose successor starts at or below the cursor is already seen
+            following = segment_names[position + 1:position + 2]
+            if following and int(following[0]) <= after + 1:
+                continue
+
+            with open(self._path(writer, segment_name, SEGMENT_SUFFIX), "rb") as segment:
+                for line in segment:
+                    # A line without its newline is still being appended (or
+                    # was torn by a crash); it is picked up once complete
+                    if not line.endswith(b"\n"):
+                        return
+                    event = json.loads(line)
+                    if event["s"] > after:
+                        yield {**event, "w": writer}
+
+    def _refresh_index(self):
+        """Read any .idx lines appended since the last call, from every writer."""
+        with self._index_lock:
+            for writer in self._writers():
+                for segment_name in self._segment_names(writer):
+                    key = (writer, segment_name)
+                    index_path = self._path(writer, segment_name, INDEX_SUFFIX)
+                    if not os.path.exists(index_path):
+                        continue
+
+                    with open(index_path, "rb") as index:
+                        index.seek(self._index_positions.get(key, 0))
+                        pending = index.read()
+
+                    # Another writer may be mid-append; leave a partial line for next time
+                    complete = pending[: pending.rfind(b"\n") + 1]
+                    for line in complete.splitlines():
+                        request_id, offset = json.loads(line)
+                        self._index.setdefault(request_id, []).append((writer, segment_name, offset))
+                    self._index_positions[key] = self._index_positions.get(key, 0) + len(complete)
+
+    def _load(self):
+        segment_names = self._segment_names(self.writer)
+        if not segment_names:
+            return
+
+        self._segment = segment_names[-1]
+        self._seq = int(self._segment) - 1
+        self._repair_segment()
+
+        with open(self._path(self.writer, self._segment, SEGMENT_SUFFIX), "rb") as segment:
+            last_line = None
+            for last_line in segment:
+                pass
+        if last_line:
+            self._seq = json.loads(last_line)["s"]
+
+    def _repair_segment(self):
+        """
+        Cut a torn trailing line, left by a crash mid-append, off this
+        writer's last segment, and drop index entries that pointed into it.
+        """
+        segment_path = self._path(self.writer, self._segment, SEGMENT_SUFFIX)
+        with open(segment_path, "rb") as segment:
+            data = segment.read()
+        size = data.rfind(b"\n") + 1
+        if size < len(data):
+            logger.warning("Truncating torn event log line in %s", segment_path)
+            os.truncate(segment_path, size)
+
+        index_path = self._path(self.writer, self._segment, INDEX_SUFFIX)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "rb") as index:
+            index_data = index.read()
+        kept = [
+            line for line in index_data[: index_data.rfind(b"\n") + 1].splitlines(keepends=True)
+            if json.loads(line)[1] < size
+        ]
+        if b"".join(kept) != index_data:
+            with open(index_path, "wb") as index:
+                index.write(b"".join(kept))
+
+
+def parse_cursor(text):
+    """Parse a ``writer:seq,writer:seq`` feed cursor; raises ValueError if malformed."""
+    cursor = {}
+    for part in filter(None, text.split(",")):
+        writer, seq = part.rsplit(":", 1)
+        cursor[writer] = int(seq)
+    return cursor
+
+
+def format_cursor(cursor):
+    return ",".join(f"{writer}:{seq}" for writer, seq in sorted(cursor.items()))
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """The process-wide event log, created on first use."""
+    global _event_log
+    if _event_log is None:
+        with _event_log_lock:
+            if _event_log is None:
+                _event_log = EventLog(settings.TRIAGE_EVENT_LOG_DIR)
+                atexit.register(_event_log.close)
+    return _event_log
+
+
+def record_change(request_id, changes):
+    # Deferred to commit so rolled-back changes never reach the log; robust
+    # so a log failure is logged instead of failing the already-committed save
+    if changes:
+        transaction.on_commit(lambda: get_event_log().record(request_id, changes), robust=True)
+
+
+# 🔹 Model signal handlers
+
+def snapshot_tracked_fields(sender, instance, **kwargs):
+    instance._tracked_snapshot = {
+        field: instance.__dict__.get(field) for field in TRACKED_FIELDS
+    }
+
+
+def record_tracked_changes(sender, instance, created, **kwargs):
+    previous = {} if created else getattr(instance, "_tracked_snapshot", {})
+
+    # Deferred fields are skipped so the signal never triggers a reload
+    changes = {
+        field: instance.__dict__[field]
+        for field in TRACKED_FIELDS
+        if field in instance.__dict__
+        and (created or previous.get(field) != instance.__dict__[field])
+    }
+    record_change(instance.pk, changes)
+    snapshot_tracked_fields(sender, instance)
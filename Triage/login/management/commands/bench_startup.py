@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Runs in a fresh interpreter so every measurement is a true cold start
+WORKER_SCRIPT = """
+import io, json, sys, time
+started = time.perf_counter()
+
+from Triage.wsgi import application
+
+def call(path):
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "8000",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+    }
+    body = application(environ, lambda status, headers: None)
+    b"".join(body)
+    body.close()
+
+imported = time.perf_counter()
+call(sys.argv[1])
+first_response = time.perf_counter()
+
+requests = int(sys.argv[2])
+for _ in range(requests):
+    call(sys.argv[1])
+finished = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (first_response - started) * 1000,
+    "per_request_us": (finished - first_response) / requests * 1e6,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare cold-start time and per-request overhead of the full and API-only settings."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--path", default="/api/user-role/")
+        parser.add_argument(
+            "--settings-modules",
+            nargs="+",
+            default=["Triage.settings", "Triage.settings_api"],
+        )
+
+    def handle(self, *args, **options):
+        for settings_module in options["settings_modules"]:
+            samples = [
+                self.run_worker(settings_module, options["path"], options["requests"])
+                for _ in range(options["runs"])
+            ]
+
+            def best(key):
+                return min(sample[key] for sample in samples)
+
+            self.stdout.write(
+                f"{settings_module:<24} "
+                f"import {best('import_ms'):7.1f} ms  "
+                f"first response {best('first_response_ms'):7.1f} ms  "
+                f"per request {best('per_request_us'):7.1f} us"
+            )
+
+    def run_worker(self, settings_module, path, requests):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+        output = subprocess.run(
+            [sys.executable, "-c", WORKER_SCRIPT, path, str(requests)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
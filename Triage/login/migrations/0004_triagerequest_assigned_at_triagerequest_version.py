@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0003_rename_blood_pressure_triagerequest_oxygen_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagerequest',
+            name='assigned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='triagerequest',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+def backfill_sync_versions(apps, schema_editor):
+    Patient = apps.get_model('login', 'Patient')
+    TriageRequest = apps.get_model('login', 'TriageRequest')
+    SyncCounter = apps.get_model('login', 'SyncCounter')
+
+    version = 0
+    for model in (Patient, TriageRequest):
+        for row in model.objects.order_by('pk').only('pk'):
+            version += 1
+            model.objects.filter(pk=row.pk).update(sync_version=version)
+
+    SyncCounter.objects.create(pk=1, value=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0004_triagerequest_assigned_at_triagerequest_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='client_id',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='sync_version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='triagerequest',
+            name='client_id',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='triagerequest',
+            name='sync_version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_sync_versions, migrations.RunPython.noop),
+    ]
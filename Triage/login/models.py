@@ -1,7 +1,101 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
 
+class SyncCounter(models.Model):
+    """Single-row counter that hands out the global sync cursor."""
+    value = models.BigIntegerField(default=0)
+
+
+def next_sync_version():
+    # Must run inside a transaction: the UPDATE holds the counter row until
+    # commit, so versions become visible to readers in increasing order.
+    #
+    # That makes the counter a deliberate serialization point. A plain
+    # sequence would not block, but a transaction could then commit version
+    # N after N+1 was already pulled, and the device would never see N.
+    # Callers take it as their last statement, so it is held only from
+    # there to COMMIT, and the conditional claim UPDATE runs before it.
+    # SQLite, which this project runs on, allows one writer at a time anyway.
+    if not SyncCounter.objects.filter(pk=1).update(value=F("value") + 1):
+        SyncCounter.objects.get_or_create(pk=1)
+        SyncCounter.objects.filter(pk=1).update(value=F("value") + 1)
+    return SyncCounter.objects.values_list("value", flat=True).get(pk=1)
+
+
+class SyncedQuerySet(models.QuerySet):
+    """
+    Bumps ``sync_version`` on the bulk paths that bypass ``save()``, so
+    rows written with ``update()``, ``bulk_create()`` or ``bulk_update()``
+    still reach devices. Raw SQL is not covered.
+    """
+
+    def update(self, **kwargs):
+        # Rows first, counter second, as in SyncedModel.save
+        with transaction.atomic(using=self.db):
+            pks = list(self.select_for_update().values_list("pk", flat=True))
+            if not pks:
+                return 0
+
+            # Keep the original filter so conditional updates (e.g. claiming
+            # an unassigned case) still only touch rows that match it
+            updated = super(SyncedQuerySet, self.filter(pk__in=pks)).update(**kwargs)
+            if updated:
+                self.model._base_manager.filter(pk__in=pks).update(sync_version=next_sync_version())
+        return updated
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            # The rows are new, so no other writer can hold them while we
+            # wait on the counter; taking it first cannot deadlock
+            version = next_sync_version() if objs else 0
+            for obj in objs:
+                obj.sync_version = version
+            return super().bulk_create(objs, *args, **kwargs)
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            if updated:
+                version = next_sync_version()
+                self.model._base_manager.filter(pk__in=[obj.pk for obj in objs]).update(sync_version=version)
+                for obj in objs:
+                    obj.sync_version = version
+        return updated
+
+    bulk_update.alters_data = True
+
+
+class SyncedModel(models.Model):
+    """
+    Rows that offline clients sync. ``client_id`` is generated on the device
+    that created the row; ``sync_version`` is bumped on every save and is
+    the cursor clients pull deltas against.
+    """
+    client_id = models.UUIDField(null=True, blank=True, unique=True)
+    sync_version = models.BigIntegerField(default=0, db_index=True)
+
+    objects = SyncedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Row first, counter second: every writer takes the two locks in
+        # this order (see also SyncedQuerySet), so they cannot deadlock.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_version = next_sync_version()
+            type(self)._base_manager.filter(pk=self.pk).update(sync_version=self.sync_version)
+
+
 class StaffProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
@@ -12,7 +106,7 @@ class StaffProfile(models.Model):
         return self.user.get_full_name()
 
 
-class Patient(models.Model):
+class Patient(SyncedModel):
     full_name = models.CharField(max_length=100)
     age = models.IntegerField()
     gender = models.CharField(max_length=10)
@@ -33,6 +127,14 @@ class Patient(models.Model):
     previous_heart_attack = models.BooleanField(default=False)
     previous_hospitalization = models.BooleanField(default=False)
 
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="created_patients"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -40,7 +142,7 @@ class Patient(models.Model):
 
 
 
-class TriageRequest(models.Model):
+class TriageRequest(SyncedModel):
 
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     nurse = models.ForeignKey(User, on_delete=models.CASCADE, related_name="nurse_requests")
@@ -97,6 +199,48 @@ class TriageRequest(models.Model):
         blank=True,
         related_name="doctor_requests"
     )
+    assigned_at = models.DateTimeField(null=True, blank=True)
+
+    # Bumped on every assignment change; used for optimistic locking
+    version = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+
+
+class SyncChange(models.Model):
+    """
+    A device change that was applied, keyed by its device-generated id, so
+    a resent batch is answered with the original result.
+    """
+    change_id = models.UUIDField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sync_changes")
+
+    client_id = models.UUIDField()
+    object_id = models.IntegerField()
+    status = models.CharField(max_length=10)
+    sync_version = models.BigIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class SyncTombstone(models.Model):
+    """
+    A synced row that was deleted, so devices pulling deltas drop it too.
+    One is written per nurse whose device may hold the row.
+    """
+    model_name = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    client_id = models.UUIDField(null=True, blank=True, db_index=True)
+
+    # Not a constrained key: tombstones are written while a deleted
+    # nurse's own triage requests are being cascaded away
+    nurse = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+"
+    )
+    sync_version = models.BigIntegerField(db_index=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
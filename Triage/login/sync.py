@@ -0,0 +1,338 @@
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import Patient, SyncChange, SyncTombstone, TriageRequest, next_sync_version
+
+
+# Server-managed columns that devices can never write
+SERVER_FIELDS = {"id", "client_id", "sync_version", "created_at"}
+
+PATIENT_FIELDS = [
+    field.name for field in Patient._meta.concrete_fields
+    if field.name not in SERVER_FIELDS | {"created_by"}
+]
+
+# Nurses sync vitals and symptoms; risk and assignment stay server-side
+TRIAGE_FIELDS = [
+    field.name for field in TriageRequest._meta.concrete_fields
+    if field.name not in SERVER_FIELDS | {
+        "patient",
+        "nurse",
+        "predicted_risk",
+        "recommended_department",
+        "assigned_doctor",
+        "assigned_at",
+        "version",
+    }
+]
+
+PULL_LIMIT = 500
+
+
+class SyncError(Exception):
+    pass
+
+
+# 🔹 Push
+
+def apply_changes(user, changes):
+    """
+    Apply a batch of device changes and return one result per change.
+
+    Each change is ``{"change_id", "type", "client_id", "base_version",
+    "data"}``, where ``change_id`` is generated on the device. A change
+    whose ``change_id`` was already applied is answered with its original
+    result, so devices can safely resend a batch whose response they never
+    received. Otherwise a change is applied when ``base_version`` matches
+    the row's current ``sync_version`` (or the row does not exist yet), or
+    reported ``unchanged`` if the row already holds its data. Anything
+    else is a ``conflict`` and carries the server's copy of the row.
+
+    Later changes to a record already written earlier in the same batch
+    are checked against the version that write produced, so a device can
+    queue several offline edits to one record.
+    """
+    results = []
+    # (type, client_id) -> sync_version handed out earlier in this batch
+    batch_versions = {}
+
+    for change in changes:
+        client_id = change.get("client_id") if isinstance(change, dict) else None
+        try:
+            with transaction.atomic():
+                change_id = parse_change_id(change)
+                outcome = previous_outcome(user, change_id)
+                if outcome is None:
+                    outcome = apply_change(user, change, batch_versions)
+                    remember_outcome(user, change_id, outcome)
+        except SyncError as exc:
+            outcome = {"client_id": client_id, "status": "error", "error": str(exc)}
+        except ValidationError as exc:
+            error = exc.message_dict if hasattr(exc, "error_dict") else exc.messages
+            outcome = {"client_id": client_id, "status": "error", "error": error}
+        except IntegrityError:
+            outcome = {"client_id": client_id, "status": "error", "error": "Integrity error"}
+        except DatabaseError:
+            # e.g. a lock timeout; the device can retry this change later
+            outcome = {"client_id": client_id, "status": "error", "error": "Database busy"}
+
+        if outcome["status"] in ("applied", "unchanged"):
+            batch_versions[change["type"], outcome["client_id"]] = outcome["sync_version"]
+        results.append(outcome)
+
+    return results
+
+
+def parse_change_id(change):
+    if not isinstance(change, dict):
+        raise SyncError("Change must be an object")
+
+    try:
+        return uuid.UUID(str(change.get("change_id")))
+    except ValueError:
+        raise SyncError("Invalid change_id")
+
+
+def previous_outcome(user, change_id):
+    """The stored result of a change this user already sent, if any."""
+    applied = SyncChange.objects.filter(change_id=change_id, user=user).first()
+    if applied is None:
+        return None
+
+    return {
+        "client_id": str(applied.client_id),
+        "id": applied.object_id,
+        "status": applied.status,
+        "sync_version": applied.sync_version,
+    }
+
+
+def remember_outcome(user, change_id, outcome):
+    # Conflicts are not stored: the device resolves them with a new change
+    if outcome["status"] in ("applied", "unchanged"):
+        SyncChange.objects.create(
+            change_id=change_id,
+            user=user,
+            client_id=outcome["client_id"],
+            object_id=outcome["id"],
+            status=outcome["status"],
+            sync_version=outcome["sync_version"],
+        )
+
+
+def apply_change(user, change, batch_versions=None):
+    if not isinstance(change, dict):
+        raise SyncError("Change must be an object")
+
+    if change.get("type") == "patient":
+        model, fields = Patient, PATIENT_FIELDS
+    elif change.get("type") == "triage_request":
+        model, fields = TriageRequest, TRIAGE_FIELDS
+    else:
+        raise SyncError("Unknown change type")
+
+    try:
+        client_id = uuid.UUID(str(change.get("client_id")))
+    except ValueError:
+        raise SyncError("Invalid client_id")
+
+    data = change.get("data")
+    if not isinstance(data, dict):
+        raise SyncError("Missing data")
+
+    unknown = set(data) - set(fields) - {"patient", "patient_client_id"}
+    if unknown:
+        raise SyncError(f"Fields not writable: {', '.join(sorted(unknown))}")
+
+    values = {
+        name: model._meta.get_field(name).to_python(value)
+        for name, value in data.items()
+        if name in fields
+    }
+    if model is TriageRequest and ("patient" in data or "patient_client_id" in data):
+        values["patient"] = resolve_patient(user, data)
+
+    row = model.objects.select_for_update().filter(client_id=client_id).first()
+
+    if row is None and SyncTombstone.objects.filter(model_name=change["type"], client_id=client_id).exists():
+        raise SyncError("Record was deleted")
+
+    if row is None:
+        row = model(client_id=client_id, **values)
+        if model is TriageRequest:
+            row.nurse = user
+        else:
+            row.created_by = user
+        row.full_clean(validate_unique=False)
+        row.save()
+        return result(row, "applied")
+
+    if model is TriageRequest and row.nurse_id != user.pk:
+        raise SyncError("Triage request belongs to another nurse")
+
+    if model is Patient and not visible_patients(user).filter(pk=row.pk).exists():
+        raise SyncError("Patient belongs to another nurse")
+
+    if all(getattr(row, name) == value for name, value in values.items()):
+        return result(row, "unchanged")
+
+    base_version = (batch_versions or {}).get(
+        (change["type"], str(client_id)), change.get("base_version")
+    )
+    if base_version != row.sync_version:
+        return {**result(row, "conflict"), "server": serialize(user, model, row)}
+
+    for name, value in values.items():
+        setattr(row, name, value)
+    row.full_clean(validate_unique=False)
+    # Only the columns the device sent, so server-side fields such as the
+    # assignment and its optimistic-lock version are never written back
+    row.save(update_fields=list(values))
+    return result(row, "applied")
+
+
+def resolve_patient(user, data):
+    if data.get("patient_client_id") is not None:
+        lookup = {"client_id": data["patient_client_id"]}
+    else:
+        lookup = {"pk": data["patient"]}
+
+    try:
+        return visible_patients(user).get(**lookup)
+    except (Patient.DoesNotExist, TypeError, ValueError, ValidationError):
+        raise SyncError("Unknown patient")
+
+
+def result(row, status):
+    return {
+        "client_id": str(row.client_id),
+        "id": row.pk,
+        "status": status,
+        "sync_version": row.sync_version,
+    }
+
+
+# 🔹 Deletes (connected in LoginConfig.ready)
+
+def collect_deletion_audience(sender, instance, **kwargs):
+    # pre_delete: a patient's triage requests are cascaded away before the
+    # patient itself, so note whose devices hold it while they still exist
+    instance._sync_audience = {instance.created_by_id} | set(
+        TriageRequest.objects.filter(patient=instance).values_list("nurse_id", flat=True)
+    )
+
+
+def record_deletion(sender, instance, **kwargs):
+    # post_delete, so the deleted row is locked before the counter is taken
+    if sender is Patient:
+        audience = getattr(instance, "_sync_audience", {instance.created_by_id})
+        model_name, audience = "patient", audience - {None}
+    else:
+        model_name, audience = "triage_request", {instance.nurse_id}
+
+    if not audience:
+        return
+
+    version = next_sync_version()
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(
+            model_name=model_name,
+            object_id=instance.pk,
+            client_id=instance.client_id,
+            nurse_id=nurse_id,
+            sync_version=version,
+        )
+        for nurse_id in audience
+    ])
+
+
+# 🔹 Pull
+
+def visible_patients(user):
+    """Patients a nurse registered or has a triage request for."""
+    return Patient.objects.filter(
+        Q(created_by=user)
+        | Q(pk__in=TriageRequest.objects.filter(nurse=user).values("patient_id"))
+    )
+
+
+def patient_rows(user):
+    return visible_patients(user).values("id", "client_id", "sync_version", *PATIENT_FIELDS)
+
+
+def triage_rows(user):
+    return TriageRequest.objects.filter(nurse=user).values(
+        "id",
+        "client_id",
+        "sync_version",
+        "patient_id",
+        "predicted_risk",
+        "recommended_department",
+        "assigned_doctor_id",
+        "created_at",
+        *TRIAGE_FIELDS,
+        patient_client_id=F("patient__client_id"),
+    )
+
+
+def deleted_rows(user):
+    return SyncTombstone.objects.filter(nurse=user).values(
+        "client_id", "object_id", "sync_version", type=F("model_name")
+    )
+
+
+def serialize(user, model, row):
+    rows = patient_rows(user) if model is Patient else triage_rows(user)
+    return rows.get(pk=row.pk)
+
+
+def pull_changes(user, cursor, limit=PULL_LIMIT):
+    """
+    Rows changed after ``cursor`` and tombstones for rows deleted since,
+    merged in ``sync_version`` order and capped at ``limit``. The returned
+    cursor is the last version included, so a client that sees
+    ``has_more`` simply calls again with it.
+
+    Rows written by one bulk update share a version, so a page never ends
+    partway through a version; a single version larger than ``limit`` is
+    returned whole.
+    """
+    streams = {
+        "patients": patient_rows(user),
+        "triage_requests": triage_rows(user),
+        "deleted": deleted_rows(user),
+    }
+
+    merged = sorted(
+        (
+            (table, row)
+            for table, rows in streams.items()
+            for row in rows.filter(sync_version__gt=cursor).order_by("sync_version")[: limit + 1]
+        ),
+        key=lambda item: item[1]["sync_version"],
+    )
+    page = merged[:limit]
+    has_more = len(merged) > limit
+
+    if has_more:
+        boundary = merged[limit][1]["sync_version"]
+        page = [item for item in page if item[1]["sync_version"] < boundary]
+        if not page:
+            page = [
+                (table, row)
+                for table, rows in streams.items()
+                for row in rows.filter(sync_version=boundary).order_by("pk")
+            ]
+
+    delta = {table: [] for table in streams}
+    for table, row in page:
+        delta[table].append(row)
+
+    return {
+        **delta,
+        "cursor": page[-1][1]["sync_version"] if page else cursor,
+        "has_more": has_more,
+    }
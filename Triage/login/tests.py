@@ -1,3 +1,731 @@
-from django.test import TestCase
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+import threading
+import time
+from collections import Counter
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from Triage import settings_api
+
+from . import assignment, events, sync
+from .events import EventLog
+from .models import Patient, TriageRequest
+
+
+def setUpModule():
+    # Keep the signal-driven event log out of the project directory
+    global _log_dir, _original_event_log
+    _log_dir = tempfile.mkdtemp()
+    _original_event_log = events._event_log
+    events._event_log = EventLog(_log_dir)
+
+
+def tearDownModule():
+    events._event_log.close()
+    events._event_log = _original_event_log
+    shutil.rmtree(_log_dir)
+
+
+def make_requests(nurse, count, **fields):
+    patient = Patient.objects.create(full_name="Test Patient", age=40, gender="F")
+    TriageRequest.objects.bulk_create([
+        TriageRequest(
+            patient=patient,
+            nurse=nurse,
+            systolic_bp=120,
+            heart_rate=80,
+            temperature=37.0,
+            oxygen=98,
+            **fields,
+        )
+        for _ in range(count)
+    ])
+    return list(TriageRequest.objects.order_by("pk").values_list("pk", flat=True))
+
+
+class AssignmentTests(TestCase):
+
+    def setUp(self):
+        self.nurse = User.objects.create_user("nurse", password="x")
+        self.doctor_a = User.objects.create_user("doctor_a", password="x")
+        self.doctor_b = User.objects.create_user("doctor_b", password="x")
+
+    def test_claim_request_only_once(self):
+        [request_id] = make_requests(self.nurse, 1)
+
+        self.assertTrue(assignment.claim_request(request_id, self.doctor_a))
+        self.assertFalse(assignment.claim_request(request_id, self.doctor_b))
+
+        triage_request = TriageRequest.objects.get(pk=request_id)
+        self.assertEqual(triage_request.assigned_doctor, self.doctor_a)
+        self.assertEqual(triage_request.version, 1)
+        self.assertIsNotNone(triage_request.assigned_at)
+
+    def test_reassign_rejects_stale_version(self):
+        [request_id] = make_requests(self.nurse, 1)
+        assignment.claim_request(request_id, self.doctor_a)
+
+        self.assertFalse(assignment.reassign_request(request_id, self.doctor_b, expected_version=0))
+        self.assertTrue(assignment.reassign_request(request_id, self.doctor_b, expected_version=1))
+        self.assertEqual(TriageRequest.objects.get(pk=request_id).assigned_doctor, self.doctor_b)
+
+    def test_release_only_by_owner(self):
+        [request_id] = make_requests(self.nurse, 1)
+        assignment.claim_request(request_id, self.doctor_a)
+
+        self.assertFalse(assignment.release_request(request_id, self.doctor_b))
+        self.assertTrue(assignment.release_request(request_id, self.doctor_a))
+        self.assertIsNone(TriageRequest.objects.get(pk=request_id).assigned_doctor)
+
+    def test_claim_next_prefers_high_risk(self):
+        make_requests(self.nurse, 2, predicted_risk="Low")
+        high_ids = make_requests(self.nurse, 1, predicted_risk="High")[-1:]
+
+        claimed = assignment.claim_next(self.doctor_a, limit=2)
+
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(claimed[0], high_ids[0])
+
+    def test_claim_next_stops_when_queue_empty(self):
+        make_requests(self.nurse, 3)
+
+        self.assertEqual(len(assignment.claim_next(self.doctor_a, limit=5)), 3)
+        self.assertEqual(assignment.claim_next(self.doctor_b, limit=5), [])
+
+
+class AssignmentStressTests(TransactionTestCase):
+
+    WORKERS = 8
+    CASES = 200
+    BATCH = 5
+
+    # Far below what SQLite manages locally; catches claims serialising badly
+    MIN_CLAIMS_PER_SECOND = 20
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed database such as Triage.settings_test")
+
+    def test_concurrent_claims_never_double_assign(self):
+        nurse = User.objects.create_user("nurse", password="x")
+        doctors = [
+            User.objects.create_user(f"doctor_{i}", password="x")
+            for i in range(self.WORKERS)
+        ]
+        make_requests(nurse, self.CASES)
+
+        results = {doctor.pk: [] for doctor in doctors}
+        errors = []
+        start = threading.Barrier(self.WORKERS)
+
+        def worker(doctor):
+            try:
+                start.wait()
+                while True:
+                    claimed = assignment.claim_next(doctor, limit=self.BATCH)
+                    if not claimed:
+                        break
+                    results[doctor.pk].extend(claimed)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(doctor,)) for doctor in doctors]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(errors, [])
+
+        claim_counts = Counter(
+            request_id for claimed in results.values() for request_id in claimed
+        )
+        self.assertEqual(len(claim_counts), self.CASES)
+        self.assertEqual(max(claim_counts.values()), 1)
+
+        for doctor_pk, claimed in results.items():
+            self.assertEqual(
+                TriageRequest.objects.filter(assigned_doctor_id=doctor_pk).count(),
+                len(claimed),
+            )
+        self.assertFalse(TriageRequest.objects.filter(assigned_doctor__isnull=True).exists())
+
+        sys.stderr.write(
+            f"\n{self.CASES} claims by {self.WORKERS} workers in {elapsed:.3f}s "
+            f"({self.CASES / elapsed:.0f} claims/s)\n"
+        )
+        self.assertGreater(
+            self.CASES / elapsed,
+            self.MIN_CLAIMS_PER_SECOND,
+            f"{self.CASES} claims by {self.WORKERS} workers took {elapsed:.3f}s",
+        )
+
+
+class EventLogTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.log = EventLog(self.directory, flush_interval=60)
+        self.addCleanup(self.log.close)
+
+    def test_history_and_rebuild(self):
+        self.log.record(1, {"heart_rate": 80, "predicted_risk": None})
+        self.log.record(2, {"heart_rate": 70})
+        self.log.record(1, {"predicted_risk": "High"})
+
+        history = self.log.history(1)
+        self.assertEqual([event["s"] for event in history], [1, 3])
+        self.assertEqual(self.log.rebuild(1), {"heart_rate": 80, "predicted_risk": "High"})
+
+    def test_record_does_not_write_until_flushed(self):
+        self.log.record(1, {"oxygen": 95})
+
+        self.assertEqual(os.listdir(self.directory), [])
+        self.log.flush()
+        self.assertEqual(len(os.listdir(self.log.writer_directory)), 2)
+
+    def test_replay_after_cursor(self):
+        for heart_rate in range(5):
+            self.log.record(1, {"heart_rate": heart_rate})
+
+        self.assertEqual(
+            [event["s"] for event in self.log.replay(after={self.log.writer: 3})],
+            [4, 5],
+        )
+
+    def test_segments_roll_over_and_reload(self):
+        small_log = EventLog(self.directory, flush_interval=60, segment_max_bytes=1)
+        for request_id in range(3):
+            small_log.record(request_id, {"oxygen": 90 + request_id})
+            small_log.flush()
+        small_log.close()
+
+        reopened = EventLog(self.directory, flush_interval=60)
+        self.addCleanup(reopened.close)
+
+        segments = [name for name in os.listdir(reopened.writer_directory) if name.endswith(".ndjson")]
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(reopened.rebuild(2), {"oxygen": 92})
+        self.assertEqual(reopened.record(0, {"oxygen": 99}), 4)
+
+
+    def test_replay_skips_segments_behind_cursor(self):
+        small_log = EventLog(self.directory, flush_interval=60, segment_max_bytes=1)
+        self.addCleanup(small_log.close)
+        for heart_rate in range(3):
+            small_log.record(1, {"heart_rate": heart_rate})
+            small_log.flush()
+
+        # Only a segment the cursor has fully passed may go unread
+        os.remove(os.path.join(small_log.writer_directory, "000000000001.ndjson"))
+
+        self.assertEqual(
+            [event["s"] for event in small_log.replay(after={small_log.writer: 1})],
+            [2, 3],
+        )
+
+    def test_writers_sharing_a_directory(self):
+        first = EventLog(self.directory, writer="worker-a", flush_interval=60)
+        second = EventLog(self.directory, writer="worker-b", flush_interval=60)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+
+        first.record(1, {"oxygen": 95})
+        second.record(1, {"oxygen": 93})
+        second.record(2, {"heart_rate": 70})
+        first.record(1, {"predicted_risk": "High"})
+        first.flush()
+        second.flush()
+
+        # Events from different writers are only ordered by timestamp
+        for log in (first, second):
+            self.assertCountEqual(
+                [(event["w"], event["s"]) for event in log.replay()],
+                [("worker-a", 1), ("worker-a", 2), ("worker-b", 1), ("worker-b", 2)],
+            )
+            self.assertCountEqual(
+                [event["c"] for event in log.history(1)],
+                [{"oxygen": 95}, {"oxygen": 93}, {"predicted_risk": "High"}],
+            )
+
+        self.assertEqual(
+            [(event["w"], event["s"]) for event in second.replay(after={"worker-a": 2, "worker-b": 1})],
+            [("worker-b", 2)],
+        )
+
+        # History picks up the other writer's later flushes too; events
+        # across writers are ordered by millisecond timestamp
+        time.sleep(0.01)
+        first.record(2, {"heart_rate": 75})
+        first.flush()
+        self.assertEqual(second.rebuild(2), {"heart_rate": 75})
+
+    def test_torn_trailing_line_is_ignored_and_repaired(self):
+        self.log.record(1, {"oxygen": 95})
+        self.log.record(1, {"oxygen": 94})
+        self.log.flush()
+
+        [segment_name] = [name for name in os.listdir(self.log.writer_directory) if name.endswith(".ndjson")]
+        segment_path = os.path.join(self.log.writer_directory, segment_name)
+        with open(segment_path, "ab") as segment:
+            segment.write(b'{"s":3,"t":1.0,"r":1,"c":{"oxy')
+
+        self.assertEqual([event["s"] for event in self.log.replay()], [1, 2])
+
+        with self.assertLogs("login.events", "WARNING"):
+            reopened = EventLog(self.directory, flush_interval=60)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.record(1, {"oxygen": 93}), 3)
+        self.assertEqual([event["s"] for event in reopened.replay()], [1, 2, 3])
+        self.assertEqual(reopened.rebuild(1), {"oxygen": 93})
+
+    def test_failed_flush_keeps_events(self):
+        self.log.record(1, {"oxygen": 95})
+        # A file where the writer directory belongs makes every write fail
+        open(self.log.writer_directory, "w").close()
+
+        with self.assertRaises(OSError):
+            self.log.flush()
+
+        os.remove(self.log.writer_directory)
+        self.log.record(1, {"oxygen": 94})
+        self.assertEqual([event["s"] for event in self.log.replay()], [1, 2])
+
+    def test_flusher_survives_write_errors(self):
+        fast_log = EventLog(self.directory, writer="fast", flush_interval=0.01)
+        self.addCleanup(fast_log.close)
+        open(fast_log.writer_directory, "w").close()
+
+        fast_log.record(1, {"oxygen": 95})
+        with self.assertLogs("login.events", "ERROR"):
+            time.sleep(0.1)
+        self.assertTrue(fast_log._flusher.is_alive())
+
+        os.remove(fast_log.writer_directory)
+        time.sleep(0.1)
+        self.assertTrue(os.path.isdir(fast_log.writer_directory))
+
+    def test_cursor_round_trip(self):
+        cursor = {"host-1": 4, "host-2": 10}
+
+        self.assertEqual(events.parse_cursor(events.format_cursor(cursor)), cursor)
+        self.assertEqual(events.parse_cursor(""), {})
+        with self.assertRaises(ValueError):
+            events.parse_cursor("host-1")
+
+
+class TriageRequestEventTests(TestCase):
+
+    def setUp(self):
+        self.nurse = User.objects.create_user("nurse", password="x")
+        self.doctor = User.objects.create_user("doctor", password="x")
+
+        # Primary keys are reused between tests, so start from an empty log
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        shared_log = events._event_log
+        events._event_log = EventLog(directory, flush_interval=60)
+        self.addCleanup(setattr, events, "_event_log", shared_log)
+        self.addCleanup(events._event_log.close)
+
+    def create_request(self):
+        patient = Patient.objects.create(full_name="Test Patient", age=40, gender="F")
+        return TriageRequest.objects.create(
+            patient=patient,
+            nurse=self.nurse,
+            systolic_bp=120,
+            heart_rate=80,
+            temperature=37.0,
+            oxygen=98,
+        )
+
+    def test_saves_and_assignments_are_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            triage_request = self.create_request()
+
+            triage_request = TriageRequest.objects.get(pk=triage_request.pk)
+            triage_request.predicted_risk = "High"
+            triage_request.save()
+            triage_request.save()
+            assignment.claim_request(triage_request.pk, self.doctor)
+
+        history = events.get_event_log().history(triage_request.pk)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history[1]["c"], {"predicted_risk": "High"})
+        self.assertEqual(
+            events.get_event_log().rebuild(triage_request.pk),
+            {
+                "systolic_bp": 120,
+                "heart_rate": 80,
+                "temperature": 37.0,
+                "oxygen": 98,
+                "predicted_risk": "High",
+                "assigned_doctor_id": self.doctor.pk,
+            },
+        )
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            triage_request = self.create_request()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                triage_request.oxygen = 80
+                triage_request.save()
+                raise RuntimeError
+
+        self.assertEqual(events.get_event_log().rebuild(triage_request.pk)["oxygen"], 98)
+
+
+@override_settings(
+    ROOT_URLCONF=settings_api.ROOT_URLCONF,
+    MIDDLEWARE=settings_api.MIDDLEWARE,
+    REST_FRAMEWORK=settings_api.REST_FRAMEWORK,
+)
+class ApiProfileTests(TestCase):
+
+    def test_api_routes_served_without_browser_middleware(self):
+        response = self.client.get("/api/user-role/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json(), {"role": "none"})
+        self.assertNotIn("X-Frame-Options", response)
+
+    def test_admin_not_routed(self):
+        self.assertEqual(self.client.get("/admin/").status_code, 404)
+
+
+def sync_change(change_type, client_id, data, base_version=None):
+    return {
+        "change_id": str(uuid.uuid4()),
+        "type": change_type,
+        "client_id": client_id,
+        "base_version": base_version,
+        "data": data,
+    }
+
+
+class SyncApiTests(TestCase):
+
+    def setUp(self):
+        self.nurse = User.objects.create_user("nurse", password="x")
+        self.nurse.groups.add(Group.objects.create(name="Nurses"))
+        self.client.force_login(self.nurse)
+
+        self.patient_id = str(uuid.uuid4())
+        self.request_id = str(uuid.uuid4())
+        self.intake = [
+            sync_change(
+                "patient",
+                self.patient_id,
+                {"full_name": "Ward Patient", "age": 61, "gender": "M", "diabetes": True},
+            ),
+            sync_change(
+                "triage_request",
+                self.request_id,
+                {
+                    "patient_client_id": self.patient_id,
+                    "systolic_bp": 150,
+                    "heart_rate": 110,
+                    "temperature": 38.2,
+                    "oxygen": 93,
+                    "chest_pain": True,
+                },
+            ),
+        ]
+
+    def sync(self, changes, cursor=None):
+        response = self.client.post(
+            "/api/sync/", {"cursor": cursor, "changes": changes}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def statuses(self, body):
+        return [result["status"] for result in body["results"]]
+
+    def test_push_then_pull_in_one_round_trip(self):
+        body = self.sync(self.intake)
+
+        self.assertEqual(self.statuses(body), ["applied", "applied"])
+        self.assertEqual(len(body["patients"]), 1)
+        self.assertEqual(len(body["triage_requests"]), 1)
+        self.assertEqual(body["triage_requests"][0]["patient_client_id"], self.patient_id)
+        self.assertEqual(body["cursor"], body["results"][1]["sync_version"])
+        self.assertFalse(body["has_more"])
+
+        triage_request = TriageRequest.objects.get(client_id=self.request_id)
+        self.assertEqual(triage_request.nurse, self.nurse)
+        self.assertTrue(triage_request.chest_pain)
+
+    def test_resent_batch_answered_with_original_results(self):
+        first = self.sync(self.intake)
+        replay = self.sync(self.intake, cursor=first["cursor"])
+
+        self.assertEqual(replay["results"], first["results"])
+        self.assertEqual(Patient.objects.count(), 1)
+        self.assertEqual(TriageRequest.objects.count(), 1)
+        self.assertEqual(replay["patients"] + replay["triage_requests"], [])
+
+    def test_same_data_under_new_change_id_is_unchanged(self):
+        self.sync(self.intake)
+
+        again = [{**change, "change_id": str(uuid.uuid4())} for change in self.intake]
+        self.assertEqual(self.statuses(self.sync(again)), ["unchanged", "unchanged"])
+
+    def test_stale_update_conflicts(self):
+        first = self.sync(self.intake)
+        base_version = first["results"][1]["sync_version"]
+
+        update = sync_change("triage_request", self.request_id, {"oxygen": 90}, base_version)
+        self.assertEqual(self.statuses(self.sync([update])), ["applied"])
+
+        stale = sync_change("triage_request", self.request_id, {"oxygen": 96}, base_version)
+        result = self.sync([stale])["results"][0]
+        self.assertEqual(result["status"], "conflict")
+        self.assertEqual(result["server"]["oxygen"], 90)
+        self.assertEqual(TriageRequest.objects.get(client_id=self.request_id).oxygen, 90)
+
+    def test_server_side_changes_appear_in_delta(self):
+        first = self.sync(self.intake)
+        doctor = User.objects.create_user("doctor", password="x")
+
+        assignment.claim_request(TriageRequest.objects.get(client_id=self.request_id).pk, doctor)
+
+        delta = self.sync([], cursor=first["cursor"])
+        self.assertEqual(delta["patients"], [])
+        self.assertEqual(delta["triage_requests"][0]["assigned_doctor_id"], doctor.pk)
+
+    def test_invalid_changes_reported_per_item(self):
+        body = self.sync([
+            {**self.intake[0], "change_id": None},
+            sync_change("patient", "not-a-uuid", {}),
+            sync_change("patient", str(uuid.uuid4()), {"age": 40}),
+            sync_change("triage_request", str(uuid.uuid4()), {"predicted_risk": "Low"}),
+            self.intake[0],
+        ])
+
+        self.assertEqual(self.statuses(body), ["error", "error", "error", "error", "applied"])
+        self.assertEqual(Patient.objects.count(), 1)
+
+    def test_pull_pages_by_cursor(self):
+        for _ in range(3):
+            Patient.objects.create(full_name="Existing", age=30, gender="F", created_by=self.nurse)
+
+        page = sync.pull_changes(self.nurse, 0, limit=2)
+        self.assertEqual(len(page["patients"]), 2)
+        self.assertTrue(page["has_more"])
+
+        rest = sync.pull_changes(self.nurse, page["cursor"], limit=2)
+        self.assertEqual(len(rest["patients"]), 1)
+        self.assertFalse(rest["has_more"])
+
+    def test_bulk_writes_appear_in_delta(self):
+        first = self.sync(self.intake)
+
+        Patient.objects.bulk_create([
+            Patient(full_name="Bulk Patient", age=30, gender="F", created_by=self.nurse)
+            for _ in range(2)
+        ])
+        TriageRequest.objects.filter(nurse=self.nurse).update(predicted_risk="High")
+        patient = Patient.objects.get(client_id=self.patient_id)
+        patient.age = 62
+        Patient.objects.bulk_update([patient], ["age"])
+
+        delta = self.sync([], cursor=first["cursor"])
+        self.assertEqual(sorted(row["age"] for row in delta["patients"]), [30, 30, 62])
+        self.assertEqual(delta["triage_requests"][0]["predicted_risk"], "High")
+
+    def test_pages_never_split_a_bulk_write(self):
+        Patient.objects.create(full_name="Single", age=30, gender="F", created_by=self.nurse)
+        Patient.objects.bulk_create([
+            Patient(full_name="Bulk Patient", age=30, gender="F", created_by=self.nurse)
+            for _ in range(3)
+        ])
+
+        page = sync.pull_changes(self.nurse, 0, limit=2)
+        self.assertEqual([row["full_name"] for row in page["patients"]], ["Single"])
+        self.assertTrue(page["has_more"])
+
+        rest = sync.pull_changes(self.nurse, page["cursor"], limit=2)
+        self.assertEqual(len(rest["patients"]), 3)
+        rest = sync.pull_changes(self.nurse, rest["cursor"], limit=2)
+        self.assertEqual(rest["patients"], [])
+        self.assertFalse(rest["has_more"])
+
+    def test_cascaded_deletes_reach_devices(self):
+        first = self.sync(self.intake)
+        other_nurse = User.objects.create_user("other", password="x")
+
+        Patient.objects.filter(client_id=self.patient_id).delete()
+
+        delta = self.sync([], cursor=first["cursor"])
+        self.assertCountEqual(
+            [(row["type"], str(row["client_id"])) for row in delta["deleted"]],
+            [("patient", self.patient_id), ("triage_request", self.request_id)],
+        )
+        self.assertEqual(delta["patients"] + delta["triage_requests"], [])
+        self.assertEqual(sync.pull_changes(other_nurse, 0)["deleted"], [])
+
+    def test_deleted_record_is_not_recreated(self):
+        self.sync(self.intake)
+        TriageRequest.objects.filter(client_id=self.request_id).delete()
+
+        edit = sync_change("triage_request", self.request_id, {"oxygen": 90})
+        self.assertEqual(self.statuses(self.sync([edit])), ["error"])
+        self.assertFalse(TriageRequest.objects.exists())
+
+    def queued_batch(self):
+        return [
+            *self.intake,
+            sync_change("patient", self.patient_id, {"age": 62}),
+            sync_change("triage_request", self.request_id, {"oxygen": 91}),
+            sync_change("triage_request", self.request_id, {"oxygen": 89}),
+        ]
+
+    def test_queued_edits_to_one_record_in_one_batch(self):
+        body = self.sync(self.queued_batch())
+
+        self.assertEqual(self.statuses(body), ["applied"] * 5)
+        self.assertEqual(Patient.objects.get(client_id=self.patient_id).age, 62)
+        self.assertEqual(TriageRequest.objects.get(client_id=self.request_id).oxygen, 89)
+
+    def test_resent_queued_batch_has_no_conflicts(self):
+        batch = self.queued_batch()
+        first = self.sync(batch)
+        replay = self.sync(batch)
+
+        self.assertEqual(self.statuses(replay), ["applied"] * 5)
+        self.assertEqual(replay["results"], first["results"])
+        self.assertEqual(TriageRequest.objects.get(client_id=self.request_id).oxygen, 89)
+
+    def test_malformed_bodies_rejected(self):
+        response = self.client.post("/api/sync/", [], content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        data = {**self.intake[1]["data"], "patient": {}}
+        del data["patient_client_id"]
+        change = sync_change("triage_request", self.request_id, data)
+        self.assertEqual(self.statuses(self.sync([change])), ["error"])
+
+    def test_other_nurses_patients_are_private(self):
+        other_nurse = User.objects.create_user("other", password="x")
+        other_patient = Patient.objects.create(
+            full_name="Other Patient", age=50, gender="F", created_by=other_nurse, client_id=uuid.uuid4()
+        )
+
+        body = self.sync([
+            sync_change(
+                "patient",
+                str(other_patient.client_id),
+                {"allergies": "None"},
+                other_patient.sync_version,
+            ),
+            sync_change(
+                "triage_request",
+                str(uuid.uuid4()),
+                {**self.intake[1]["data"], "patient_client_id": str(other_patient.client_id)},
+            ),
+        ])
+
+        self.assertEqual(self.statuses(body), ["error", "error"])
+        self.assertEqual(body["patients"], [])
+        self.assertEqual(Patient.objects.get(pk=other_patient.pk).allergies, "")
+
+    def test_device_edit_leaves_assignment_alone(self):
+        first = self.sync(self.intake)
+        doctor = User.objects.create_user("doctor", password="x")
+        triage_request = TriageRequest.objects.get(client_id=self.request_id)
+        assignment.claim_request(triage_request.pk, doctor)
+        triage_request.refresh_from_db()
+
+        edit = sync_change("triage_request", self.request_id, {"oxygen": 90}, triage_request.sync_version)
+        result = self.sync([edit], cursor=first["cursor"])["results"][0]
+
+        self.assertEqual(result["status"], "applied")
+        triage_request.refresh_from_db()
+        self.assertEqual(triage_request.assigned_doctor, doctor)
+        self.assertEqual(triage_request.version, 1)
+
+    def test_requires_nurse(self):
+        self.client.force_login(User.objects.create_user("doctor", password="x"))
+
+        self.assertEqual(self.client.post("/api/sync/", {}, content_type="application/json").status_code, 403)
+
+
+class ClaimCasesApiTests(TestCase):
+
+    def setUp(self):
+        nurse = User.objects.create_user("nurse", password="x")
+        self.doctor = User.objects.create_user("doctor", password="x")
+        self.doctor.groups.add(Group.objects.create(name="Doctors"))
+        self.client.force_login(self.doctor)
+
+        self.low_ids = make_requests(nurse, 2, predicted_risk="Low")
+        self.high_id = make_requests(nurse, 1, predicted_risk="High")[-1]
+
+    def test_claimed_cases_returned_in_priority_order(self):
+        response = self.client.post("/api/claim-cases/", {"limit": 3}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.json()["claimed"]],
+            [self.high_id, *self.low_ids],
+        )
+
+
+class EventApiTests(TestCase):
+
+    def setUp(self):
+        self.nurse = User.objects.create_user("nurse", password="x")
+        self.nurse.groups.add(Group.objects.create(name="Nurses"))
+        other_nurse = User.objects.create_user("other", password="x")
+        self.doctor = User.objects.create_user("doctor", password="x")
+        self.doctor.groups.add(Group.objects.create(name="Doctors"))
+
+        [self.own_id] = make_requests(self.nurse, 1)
+        self.other_id = make_requests(other_nurse, 1)[-1]
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        shared_log = events._event_log
+        events._event_log = EventLog(directory, flush_interval=60)
+        self.addCleanup(setattr, events, "_event_log", shared_log)
+        self.addCleanup(events._event_log.close)
+
+        for request_id in (self.own_id, self.other_id):
+            events._event_log.record(request_id, {"oxygen": 95})
+
+    def test_nurse_history_limited_to_own_requests(self):
+        self.client.force_login(self.nurse)
+
+        self.assertEqual(self.client.get(f"/api/cases/{self.own_id}/history/").status_code, 200)
+        self.assertEqual(self.client.get(f"/api/cases/{self.other_id}/history/").status_code, 403)
+
+    def test_nurse_feed_limited_to_own_requests(self):
+        self.client.force_login(self.nurse)
+
+        body = self.client.get("/api/events/").json()
+        self.assertEqual([event["r"] for event in body["events"]], [self.own_id])
+
+        # The other nurse's event was skipped but the cursor moved past it
+        self.assertEqual(self.client.get("/api/events/", {"cursor": body["cursor"]}).json()["events"], [])
+
+    def test_doctor_feed_sees_all_requests(self):
+        self.client.force_login(self.doctor)
+
+        body = self.client.get("/api/events/").json()
+        self.assertEqual([event["r"] for event in body["events"]], [self.own_id, self.other_id])
+        self.assertFalse(body["has_more"])
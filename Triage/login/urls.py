@@ -11,4 +11,15 @@ urlpatterns = [
     # 🔹 Dashboard APIs
     path('api/nurse-dashboard/', views.nurse_dashboard_api),
     path('api/doctor-dashboard/', views.doctor_dashboard_api),
+
+    # 🔹 Assignment APIs
+    path('api/claim-cases/', views.claim_cases_api),
+    path('api/cases/<int:request_id>/release/', views.release_case_api),
+
+    # 🔹 Event Log APIs
+    path('api/cases/<int:request_id>/history/', views.case_history_api),
+    path('api/events/', views.event_feed_api),
+
+    # 🔹 Offline Sync API
+    path('api/sync/', views.sync_api),
 ]
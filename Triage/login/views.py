@@ -3,9 +3,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from .models import TriageRequest
+from . import assignment, sync
+from .events import format_cursor, get_event_log, parse_cursor
 from django.views.decorators.csrf import csrf_exempt
 
 
+# Event feed: events returned, and events scanned, per poll
+FEED_LIMIT = 500
+FEED_SCAN_LIMIT = 5000
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @csrf_exempt
@@ -62,6 +69,137 @@ def doctor_dashboard_api(request):
     return Response(assigned_requests)
 
 
+# 🔹 Claim Next Cases API
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def claim_cases_api(request):
+
+    if not request.user.groups.filter(name='Doctors').exists():
+        return Response({"error": "Unauthorized"}, status=403)
+
+    try:
+        limit = int(request.data.get('limit', 1))
+    except (TypeError, ValueError):
+        return Response({"error": "Invalid limit"}, status=400)
+
+    if limit < 1 or limit > 50:
+        return Response({"error": "Limit must be between 1 and 50"}, status=400)
+
+    claimed_ids = assignment.claim_next(request.user, limit=limit)
+
+    claimed_requests = {
+        row["id"]: row
+        for row in TriageRequest.objects.filter(pk__in=claimed_ids).values()
+    }
+
+    # Keep the priority order claim_next handed the cases out in
+    return Response({"claimed": [claimed_requests[pk] for pk in claimed_ids]})
+
+
+# 🔹 Release Case API
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def release_case_api(request, request_id):
+
+    if not request.user.groups.filter(name='Doctors').exists():
+        return Response({"error": "Unauthorized"}, status=403)
+
+    if not assignment.release_request(request_id, request.user):
+        return Response({"error": "Case is not assigned to you"}, status=409)
+
+    return Response({"message": "Case released"})
+
+
+# 🔹 Case History API
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def case_history_api(request, request_id):
+
+    if not request.user.groups.filter(name__in=['Nurses', 'Doctors']).exists():
+        return Response({"error": "Unauthorized"}, status=403)
+
+    # Nurses only see their own requests, as on the nurse dashboard
+    if not request.user.groups.filter(name='Doctors').exists():
+        if not TriageRequest.objects.filter(pk=request_id, nurse=request.user).exists():
+            return Response({"error": "Unauthorized"}, status=403)
+
+    events = get_event_log().history(request_id)
+
+    state = {}
+    for event in events:
+        state.update(event["c"])
+
+    return Response({"events": events, "state": state})
+
+
+# 🔹 Event Feed API (dashboards poll with the cursor from their last response)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def event_feed_api(request):
+
+    if not request.user.groups.filter(name__in=['Nurses', 'Doctors']).exists():
+        return Response({"error": "Unauthorized"}, status=403)
+
+    try:
+        cursor = parse_cursor(request.query_params.get('cursor', ''))
+    except ValueError:
+        return Response({"error": "Invalid cursor"}, status=400)
+
+    # Nurses only get events for their own requests, as on the nurse dashboard
+    visible_ids = None
+    if not request.user.groups.filter(name='Doctors').exists():
+        visible_ids = set(
+            TriageRequest.objects.filter(nurse=request.user).values_list('pk', flat=True)
+        )
+
+    # Skipped events still advance the cursor, and one poll never scans
+    # more than FEED_SCAN_LIMIT of them
+    events = []
+    scanned = 0
+    has_more = False
+    for event in get_event_log().replay(after=cursor):
+        if len(events) == FEED_LIMIT or scanned == FEED_SCAN_LIMIT:
+            has_more = True
+            break
+        scanned += 1
+        cursor[event["w"]] = event["s"]
+        if visible_ids is None or event["r"] in visible_ids:
+            events.append(event)
+
+    return Response({"events": events, "cursor": format_cursor(cursor), "has_more": has_more})
+
+
+# 🔹 Offline Sync API (push queued changes and pull deltas in one round-trip)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def sync_api(request):
+
+    if not request.user.groups.filter(name='Nurses').exists():
+        return Response({"error": "Unauthorized"}, status=403)
+
+    if not isinstance(request.data, dict):
+        return Response({"error": "Body must be an object"}, status=400)
+
+    changes = request.data.get('changes', [])
+    if not isinstance(changes, list):
+        return Response({"error": "Changes must be a list"}, status=400)
+
+    if len(changes) > sync.PULL_LIMIT:
+        return Response({"error": f"At most {sync.PULL_LIMIT} changes per batch"}, status=400)
+
+    try:
+        cursor = int(request.data.get('cursor') or 0)
+    except (TypeError, ValueError):
+        return Response({"error": "Invalid cursor"}, status=400)
+
+    results = sync.apply_changes(request.user, changes)
+
+    return Response({
+        "results": results,
+        **sync.pull_changes(request.user, cursor),
+    })
+
+
 # 🔹 User Role API
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -6,7 +6,10 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Triage.settings')
+    # The test suite runs against a file-backed SQLite database so threaded
+    # tests get real locking (see Triage/settings_test.py)
+    default_settings = 'Triage.settings_test' if sys.argv[1:2] == ['test'] else 'Triage.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: